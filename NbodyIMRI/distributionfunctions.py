@@ -194,15 +194,15 @@ class GeneralizedNFWSpike(SpikeDistribution):
         
 
     def Psi(self, r):
-        if (r >= self.r_soft):
-            return u.G_N * self.M_BH/r
-        else:
-            return (u.G_N * self.M_BH/self.r_soft)*(3*self.r_soft**2 - r**2)/(2*self.r_soft**2)
+        #Vectorised over r (the trailing [()] returns a scalar for scalar input)
+        Psi_outer = u.G_N * self.M_BH/r
+        Psi_inner = (u.G_N * self.M_BH/self.r_soft)*(3*self.r_soft**2 - r**2)/(2*self.r_soft**2)
+        return np.where(r >= self.r_soft, Psi_outer, Psi_inner)[()]
     
     def tabulate_f(self):
         r_vals = np.geomspace(0.1, 1e9, 10000)*self.r_isco
         rho_vals = self.rho_ini(r_vals)
-        psi_vals = np.vectorize(self.Psi)(r_vals)
+        psi_vals = self.Psi(r_vals)
         psi_min = np.min(psi_vals)
         psi_max = np.max(psi_vals)
         E_vals = 1.0*psi_vals
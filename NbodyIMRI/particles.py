@@ -3,45 +3,114 @@ from math import sqrt
 
 from os.path import join
 import os
-import matplotlib.pyplot as plt
 import numpy as np
-from tqdm import tqdm
-from scipy import signal
 
 from NbodyIMRI import distributionfunctions as DF
 from NbodyIMRI import tools
 from NbodyIMRI import units as u
 import NbodyIMRI
 
-import random
 
-import h5py
-import copy
+def _state_view(buffer, index):
+    """
+    Property exposing `index` of the array stored in attribute `buffer` as a view. 
+    Assigning to the property writes into the buffer, rather than rebinding the attribute.
+    """
+    def fget(self):
+        return getattr(self, buffer)[index]
+        
+    def fset(self, value):
+        getattr(self, buffer)[index] = value
+        
+    return property(fget, fset)
+
+
+def _init_isotropic(rhat, r, v, SpikeDF):
+    """
+    DM velocities with magnitudes v drawn from the distribution function, in isotropic random directions.
+    """
+    vhat = tools.get_random_directions(len(r))
+    return v[:,None]*vhat
+    
+def _init_circular(rhat, r, v, SpikeDF):
+    """
+    DM velocities for circular orbits, in a random direction perpendicular to rhat.
+    """
+    #Orthonormal basis perpendicular to rhat (for all particles at once): e2 is the 
+    #normalised rhat x zhat = (y, -x, 0) and e3 = rhat x e2, which is already a unit vector
+    x, y = rhat[:,0], rhat[:,1]
+    
+    e2 = np.stack([y, -x, np.zeros(len(r))], axis=-1)/np.sqrt(x*x + y*y)[:,None]
+    e3 = np.cross(rhat, e2)
+    
+    phi = 2*np.pi*np.random.rand(len(r))
+    
+    vhat = np.cos(phi)[:,None]*e2 + np.sin(phi)[:,None]*e3
+    v_circ = SpikeDF.v_max(r)/np.sqrt(2)
+    return v_circ[:,None]*vhat
+    
+def _init_polar(rhat, r, v, SpikeDF):
+    """
+    DM velocities for circular orbits passing over the poles (perpendicular to both rhat and rhat x zhat), with random sign.
+    """
+    zhat = np.array([0, 0, 1])
+    chat = np.cross(rhat, zhat)
+    chat /= np.linalg.norm(chat, axis=1, keepdims=True)
+    v1 = tools.get_random_directions(len(r))
+    v2 = np.einsum('ij,ij->i', v1, rhat)[:,None]*rhat
+    v3 = np.einsum('ij,ij->i', v1, chat)[:,None]*chat
+    vnew = v1 - v2 - v3
+    vhat = vnew/np.linalg.norm(vnew, axis=1, keepdims=True)
+    
+    sgn = np.random.choice(np.array([-1.0, 1.0]), size=len(r))
+    v_circ = SpikeDF.v_max(r)/np.sqrt(2)
+    return (sgn*v_circ)[:,None]*vhat
+    
+#Velocity initialisation for each value of `circular` in `particles.initialize_spike`
+_velocity_initializers = {0: _init_isotropic, 1: _init_circular, 2: _init_polar}
 
 
 class particles():
-    def __init__(self, M_1, M_2, N_DM=2, M_DM = 0, dynamic_BH=True):
+    """
+    Class for storing the masses, positions and velocities of the BHs and DM pseudoparticles.
+    
+    Parameters:
+        M_1 (float)     : Mass of the central BH
+        M_2 (float)     : Mass of the orbiting BH
+        N_DM (int)      : Number of DM pseudoparticles
+        M_DM (float)    : Mass of each DM pseudoparticle
+        dynamic_BH (bool): Set dynamic_BH=True in order to evolve both BHs (dynamic_BH = False fixes the central BH). Default = True
+        dtype_dm (dtype): Floating point type for the DM positions, velocities and accelerations (the BHs always use float64). 
+                            np.float32 halves the memory traffic of the DM updates, which dominates for large N_DM, but round-off then
+                            accumulates in the positions for very long runs (N_step > 1e6, where Kahan summation would be needed). Default = np.float64
+    """
+    
+    __slots__ = ('_M_1', '_M_2', '_M_tot', '_M_DM', 'N_DM', 'dynamic_BH', 
+                 '_stateBH', '_derivBH', '_stateDM', '_derivDM', '_pending', '_scratch',
+                 'rho_6', 'gamma_sp', 'alpha', 'r_t')
+    
+    def __init__(self, M_1, M_2, N_DM=2, M_DM = 0, dynamic_BH=True, dtype_dm=np.float64):
 
-        self.M_1 = M_1
-        self.M_2 = M_2
-        
-        #self.M_tot = M_1 + M_2
+        #Total BH mass is cached and updated whenever M_1 or M_2 is set
+        self._M_1   = M_1
+        self._M_2   = M_2
+        self._M_tot = M_1 + M_2
         
-        self.M_DM = M_DM*np.ones(N_DM)
+        self.M_DM = np.full(N_DM, M_DM, dtype=np.float64)
         self.N_DM = N_DM
-            
-        self.xBH1 = np.zeros((3), dtype=np.float64)
-        self.vBH1 = np.zeros((3), dtype=np.float64)
-        
-        self.xBH2 = np.zeros((3), dtype=np.float64)
-        self.vBH2 = np.zeros((3), dtype=np.float64)
         
-        self.xDM = np.zeros((N_DM, 3))
-        self.vDM = np.zeros((N_DM, 3))
-    
-        self.dvdtBH1 = None
-        self.dvdtBH2 = None
-        self.dxdtDM = None
+        #Positions and velocities are stored in contiguous buffers, one for the BHs (always float64)
+        #and one for the DM particles: _state*[0] are positions, _state*[1] are velocities, with 
+        #row 0 for BH1 and row 1 for BH2 in _stateBH. The accelerations are stored with the same 
+        #layout in _derivBH and _derivDM. xBH1, vDM etc. are views into these.
+        #The DM buffers are stored component-major, with shape (3, N_DM), so that each of the x, y, z
+        #components is a contiguous array; xDM, vDM and dvdtDM are the transposed (N_DM, 3) views.
+        self._stateBH = np.zeros((2, 2, 3), dtype=np.float64)
+        self._derivBH = np.zeros((2, 3), dtype=np.float64)
+        self._stateDM = np.zeros((2, 3, N_DM), dtype=dtype_dm)
+        self._derivDM = np.zeros((3, N_DM), dtype=dtype_dm)
+        self._pending = {}
+        self._scratch = np.empty((3, N_DM), dtype=dtype_dm)
         
         self.dynamic_BH = dynamic_BH
         
@@ -51,21 +120,116 @@ class particles():
         self.alpha    = 0.0
         self.r_t      = -1.0
     
+    xBH1    = _state_view("_stateBH", (0, 0))
+    vBH1    = _state_view("_stateBH", (1, 0))
+    xBH2    = _state_view("_stateBH", (0, 1))
+    vBH2    = _state_view("_stateBH", (1, 1))
+    dvdtBH1 = _state_view("_derivBH", 0)
+    dvdtBH2 = _state_view("_derivBH", 1)
+    
+    @property
+    def dtype_dm(self):
+        return self._stateDM.dtype
+    
+    @property
+    def xDM(self):
+        return self._pending.get(0, self._stateDM[0].T)
+    
+    @xDM.setter
+    def xDM(self, value):
+        self._set_DM_state(0, value)
+        
+    @property
+    def vDM(self):
+        return self._pending.get(1, self._stateDM[1].T)
+    
+    @vDM.setter
+    def vDM(self, value):
+        self._set_DM_state(1, value)
+    
+    @property
+    def dvdtDM(self):
+        return self._derivDM.T
+    
+    @dvdtDM.setter
+    def dvdtDM(self, value):
+        if (np.ndim(value) == 2) and (len(value) != self._derivDM.shape[1]):
+            self._derivDM = np.zeros((3, len(value)), dtype=self.dtype_dm)
+        self._derivDM.T[:] = value
+        
+    def _set_DM_state(self, i, value):
+        """
+        Assign the DM positions (i = 0) or velocities (i = 1). If the number of DM particles has changed 
+        (e.g. particles removed in `check_state`), the state buffer is reallocated and the other DM array
+        is kept aside (in `_pending`) until it has also been assigned with the new number of particles.
+        """
+        N = len(value)
+        if (N != self._stateDM.shape[2]):
+            for j in (0, 1):
+                if (j != i) and (j not in self._pending):
+                    self._pending[j] = self._stateDM[j].T
+            self._stateDM = np.zeros((2, 3, N), dtype=self.dtype_dm)
+        self._stateDM[i].T[:] = value
+        self._pending.pop(i, None)
+        
+    def _check_pending(self):
+        if (len(self._pending) > 0):
+            raise ValueError("xDM and vDM must be assigned with the same number of DM particles.")
+    
+    @property
+    def M_1(self):
+        return self._M_1
+    
+    @M_1.setter
+    def M_1(self, value):
+        self._M_1   = value
+        self._M_tot = self._M_1 + self._M_2
+    
+    @property
+    def M_2(self):
+        return self._M_2
+    
+    @M_2.setter
+    def M_2(self, value):
+        self._M_2   = value
+        self._M_tot = self._M_1 + self._M_2
+    
     def M_tot(self):
-        return self.M_1 + self.M_2
+        return self._M_tot
+        
+    @property
+    def M_DM(self):
+        return self._M_DM
+    
+    @M_DM.setter
+    def M_DM(self, value):
+        #DM masses are always a flat (N_DM,) array, so that mass-weighted sums over 
+        #the DM particles are plain matrix-vector products (e.g. acc_DM @ M_DM)
+        M_DM = np.asarray(value, dtype=np.float64)
+        if (M_DM.ndim != 1):
+            raise ValueError("M_DM must be a 1-D array, with one mass per DM particle")
+        self._M_DM = M_DM
 
     def xstep(self, h):
-        if (self.dynamic_BH):
-            self.xBH1 += self.vBH1*h
-        self.xBH2 += self.vBH2*h
-        self.xDM += self.vDM*h
+        self._check_pending()
+        #Skip the row of BH1 if it is held fixed
+        i0 = 0 if self.dynamic_BH else 1
+        self._stateBH[0, i0:] += self._stateBH[1, i0:]*h
+        dx = np.multiply(self._stateDM[1], h, out=self._get_scratch())
+        self._stateDM[0] += dx
 
 
     def vstep(self, h):
-        if (self.dynamic_BH):
-            self.vBH1 += self.dvdtBH1*h
-        self.vBH2 += self.dvdtBH2*h
-        self.vDM += self.dvdtDM*h
+        i0 = 0 if self.dynamic_BH else 1
+        self._stateBH[1, i0:] += self._derivBH[i0:]*h
+        dv = np.multiply(self._derivDM, h, out=self._get_scratch())
+        self._stateDM[1] += dv
+        
+    def _get_scratch(self):
+        #Work array for the DM (x, v) updates, so that no temporaries are allocated at each step
+        if (self._scratch.shape != self._stateDM.shape[1:]):
+            self._scratch = np.empty(self._stateDM.shape[1:], dtype=self.dtype_dm)
+        return self._scratch
         
     def orbital_elements(self):
         return tools.calc_orbital_elements(self.xBH1 - self.xBH2, self.vBH1 - self.vBH2, self.M_tot())
@@ -94,47 +258,15 @@ class particles():
                 
             r, v = SpikeDF.draw_particle(r_max, N = self.N_DM)
 
-            for i in range(self.N_DM):
-                rhat = tools.get_random_direction()
+            rhat = tools.get_random_directions(self.N_DM)
+            #DM particles are centred on BH1
+            np.add(r[:,None]*rhat, self.xBH1, out=self.xDM)
+            
+            init_velocities = _velocity_initializers.get(circular)
+            if (init_velocities is None):
+                raise ValueError("Invalid value of circular: " + str(circular))
+            self.vDM[:,:] = init_velocities(rhat, r, v, SpikeDF)
                 
-                self.xDM[i,:] = r[i]*rhat
-                if (circular == 0):
-                    vhat = tools.get_random_direction()
-                    self.vDM[i,:] = v[i]*vhat
-                    
-                if (circular == 1):
-                    #Generate an orthonormal basis
-                    v1 = 1.0*rhat
-                    v2 = np.cross(rhat, np.array([0, 0, 1]))
-                    v3 = np.cross(rhat, np.array([0, 1, 0]))
-                    
-                    u1 = 1.0*v1
-                    u2 = v2 - np.dot(u1, v2)*u1
-                    u3 = v3 - np.dot(u1, v3)*u1 - np.dot(u2, v3)*u2
-                    
-                    e2 = u2/np.sqrt(np.dot(u2, u2))
-                    e3 = u3/np.sqrt(np.dot(u3, u3))
-                    
-                    #print(np.dot(v1, e2), np.dot(v1, e3))
-                    phi = 2*np.pi*np.random.rand()
-                    
-                    vhat = np.cos(phi)*e2 + np.sin(phi)*e3
-                    self.vDM[i,:] = (SpikeDF.v_max(r[i])/np.sqrt(2))*vhat 
-                    
-                if (circular == 2):
-                    zhat = np.array([0, 0, 1])
-                    chat = np.cross(rhat, zhat)
-                    chat /= np.sqrt(np.dot(chat,chat))
-                    v1 = tools.get_random_direction()
-                    v2 = np.dot(v1, rhat)*rhat
-                    v3 = np.dot(v1, chat)*chat
-                    vnew = v1 - v2 - v3
-                    vhat = vnew/np.sqrt(np.dot(vnew,vnew))
-
-                    sgn = 2*(random.randint(0,1) - 0.5)
-                    self.vDM[i,:] = sgn*(SpikeDF.v_max(r[i])/np.sqrt(2))*vhat
-                    
-            self.xDM += self.xBH1
             #self.vDM += self.vBH1
     
     def summary(self):
@@ -152,7 +284,15 @@ class particles():
     
     
     def plot(self):
-        if (np.sum(self.M_DM) > 0):    
+        #Imported here so that matplotlib is only loaded when plotting
+        import matplotlib.pyplot as plt
+        
+        #Quantities used by more than one panel are computed once
+        has_DM = (np.sum(self.M_DM) > 0)
+        if (self.M_2 > 0):
+            a_pc = self.orbital_elements()[0]/u.pc
+        
+        if (has_DM):    
             ncols = 3
         else:
             ncols = 2
@@ -162,13 +302,12 @@ class particles():
         axes = ax[:]
         #----------------------------------------
         
-        if (np.sum(self.M_DM) > 0):
+        if (has_DM):
             axes[0].scatter(self.xDM[:,0]/u.pc, self.xDM[:,1]/u.pc, color='C0', marker='o', alpha=0.75)
         
         axes[0].scatter(self.xBH1[0]/u.pc, self.xBH1[1]/u.pc, color='k', marker='o', s=250)
         
         if (self.M_2 > 0):
-            a_pc = self.orbital_elements()[0]/u.pc
             axes[0].scatter(self.xBH2[0]/u.pc, self.xBH2[1]/u.pc, color='k', marker='o', s=40)
             axes[0].set_xlim(-1.5*a_pc, 1.5*a_pc)
             axes[0].set_ylim(-1.5*a_pc, 1.5*a_pc)
@@ -179,13 +318,12 @@ class particles():
         
         #----------------------------------------
      
-        if (np.sum(self.M_DM) > 0):
+        if (has_DM):
             axes[1].scatter(self.xDM[:,0]/u.pc, self.xDM[:,2]/u.pc, color='C0', marker='o', alpha=0.75)
      
         axes[1].scatter(self.xBH1[0]/u.pc, self.xBH1[2]/u.pc, color='k', marker='o', s=250)
         
         if (self.M_2 > 0):
-            a_pc = self.orbital_elements()[0]/u.pc
             axes[1].scatter(self.xBH2[0]/u.pc, self.xBH2[2]/u.pc, color='k', marker='o', s=40)
             axes[1].set_xlim(-1.5*a_pc, 1.5*a_pc)
             axes[1].set_ylim(-1.5*a_pc, 1.5*a_pc)
@@ -196,10 +334,14 @@ class particles():
         axes[1].set_aspect('equal')
             
         #---------------------------------------
-        if (np.sum(self.M_DM) > 0):
+        if (has_DM):
  
-            r_vals = tools.norm(self.xDM - self.xBH1)
-            axes[2].hist(np.log10(r_vals/u.pc), 50, density=True)
+            #Squared distances to BH1, computed per component (no (N_DM, 3) temporary or sqrt)
+            dx0 = self.xDM[:,0] - self.xBH1[0]
+            dx1 = self.xDM[:,1] - self.xBH1[1]
+            dx2 = self.xDM[:,2] - self.xBH1[2]
+            r_sq = dx0*dx0 + dx1*dx1 + dx2*dx2
+            axes[2].hist(0.5*np.log10(r_sq/u.pc**2), 50, density=True)
             
             axes[2].set_xlabel(r"$\log_{10}(r/\mathrm{pc})$")
             axes[2].set_ylabel(r"$P(\log_{10}(r/\mathrm{pc}))$")
@@ -237,12 +379,13 @@ def load_particles_from_file(fileID, which="initial"):
     M_DM_i = f['data'].attrs["M_DM"]*u.Msun
     dynamic = f['data'].attrs["dynamic"]
 
+    #Keep references to the h5py datasets, so that only the rows we need are read from disk
     try:
-        M1_list  = np.array(f['data']['M_1'])
-        M2_list  = np.array(f['data']['M_2'])
+        M1_list  = f['data']['M_1']
+        M2_list  = f['data']['M_2']
     except:
-        M1_list = M_1*np.ones_like(ts)
-        M2_list = M_2*np.ones_like(ts)
+        M1_list = np.array([M_1])
+        M2_list = np.array([M_2])
 
     if (dynamic == 1):
         dynamic_BH = True
@@ -258,15 +401,15 @@ def load_particles_from_file(fileID, which="initial"):
     if (which == "initial"):
         p.M_1 = M1_list[0]
         p.M_2 = M2_list[0]
-        p.xBH1 = np.array(f['data']['xBH1'])[0,:]
-        p.vBH1 = np.array(f['data']['vBH1'])[0,:]
+        p.xBH1 = f['data']['xBH1'][0,:]
+        p.vBH1 = f['data']['vBH1'][0,:]
     
-        p.xBH2 = np.array(f['data']['xBH2'])[0,:]
-        p.vBH2 = np.array(f['data']['vBH2'])[0,:]
+        p.xBH2 = f['data']['xBH2'][0,:]
+        p.vBH2 = f['data']['vBH2'][0,:]
     
         try:
-            p.xDM  = np.array(f['data']['xDM_i'])
-            p.vDM  = np.array(f['data']['vDM_i'])
+            p.xDM  = f['data']['xDM_i'][:]
+            p.vDM  = f['data']['vDM_i'][:]
         except: 
             print("Initial DM positions and velocities not found in output file... (setting to zero)")
             p.xDM = np.zeros((N_DM, 3))
@@ -276,27 +419,27 @@ def load_particles_from_file(fileID, which="initial"):
     elif (which == "final"):
         p.M_1 = M1_list[-1]
         p.M_2 = M2_list[-1]
-        p.xBH1 = np.array(f['data']['xBH1'])[-1,:]
-        p.vBH1 = np.array(f['data']['vBH1'])[-1,:]
+        p.xBH1 = f['data']['xBH1'][-1,:]
+        p.vBH1 = f['data']['vBH1'][-1,:]
     
-        p.xBH2 = np.array(f['data']['xBH2'])[-1,:]
-        p.vBH2 = np.array(f['data']['vBH2'])[-1,:]
+        p.xBH2 = f['data']['xBH2'][-1,:]
+        p.vBH2 = f['data']['vBH2'][-1,:]
     
         try:
-            p.xDM  = np.array(f['data']['xDM_f'])
-            p.vDM  = np.array(f['data']['vDM_f'])
-            p.M_DM = np.array(f['data']['M_DM'])
+            p.xDM  = f['data']['xDM_f'][:]
+            p.vDM  = f['data']['vDM_f'][:]
+            p.M_DM = f['data']['M_DM'][:]
         except: 
             print("Final DM positions and velocities not found in output file... (setting to zero)")
             p.xDM = np.zeros((N_DM, 3))
             p.vDM = np.zeros((N_DM, 3))
     
-        
+    f.close()
     
     return p
     
     
-def single_BH(M_1, N_DM=0, rho_6=1e15*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_t = -1, alpha = 2, circular=0, r_soft = -1):
+def single_BH(M_1, N_DM=0, rho_6=1e15*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_t = -1, alpha = 2, circular=0, r_soft = -1, dtype_dm=np.float64):
     """
     Initialise a `particles` object which consists of a single BH surrounded by a DM halo.
     
@@ -308,7 +451,8 @@ def single_BH(M_1, N_DM=0, rho_6=1e15*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_
         r_max (float)   : maximum radius to include for DM density profile (useful for profiles which are formally infinite). Default: 1e5*r_isco(M_1)
         r_t (float)     : Smooth truncation radius of the spike. Default = -1 (no truncation)
         alpha (float)   : Power-law slope for truncating the outer parts of the spike. Default = 2
-        circular (int)  : Set circular = 1 in order to initialise DM particles on circular orbits. Default is 0 (isotropic orbits).
+        circular (int)  : Set circular = 1 in order to initialise DM particles on circular orbits (circular = 2 for circular orbits over the poles). Default is 0 (isotropic orbits).
+        dtype_dm (dtype): Floating point type for the DM positions and velocities (see `particles`). Default = np.float64
     
     Returns:
         p (particles)   : Set of particles
@@ -331,7 +475,7 @@ def single_BH(M_1, N_DM=0, rho_6=1e15*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_
     else:
         M_DM = 0.0
     
-    p = particles(M_1, M_2=0, N_DM=N_DM, M_DM=M_DM, dynamic_BH=False)
+    p = particles(M_1, M_2=0, N_DM=N_DM, M_DM=M_DM, dynamic_BH=False, dtype_dm=dtype_dm)
     
     if (N_DM > 0):
         p.initialize_spike(rho_6, gamma_sp, r_max, r_t, alpha, circular, r_soft)
@@ -340,7 +484,7 @@ def single_BH(M_1, N_DM=0, rho_6=1e15*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_
     
     
     
-def particles_in_binary(M_1, M_2, a_i, e_i=0.0, N_DM=0, dynamic_BH=True, rho_6=1e16*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_t = -1, alpha = 2, circular = 0, include_DM_mass=False, r_soft = -1):
+def particles_in_binary(M_1, M_2, a_i, e_i=0.0, N_DM=0, dynamic_BH=True, rho_6=1e16*u.Msun/u.pc**3, gamma_sp=7/3, r_max=-1, r_t = -1, alpha = 2, circular = 0, include_DM_mass=False, r_soft = -1, dtype_dm=np.float64):
     """
     Initialise a `particles` object which consists of a BH binary, which may be surrounded by a DM halo.
     
@@ -356,8 +500,9 @@ def particles_in_binary(M_1, M_2, a_i, e_i=0.0, N_DM=0, dynamic_BH=True, rho_6=1
         r_max (float)   : maximum radius to include for DM density profile (useful for profiles which are formally infinite). Default: 1e5*r_isco(M_1)
         r_t (float)     : Smooth truncation radius of the spike. Default = -1 (no truncation)
         alpha (float)   : Power-law slope for truncating the outer parts of the spike. Default = 2
-        circular (int)  : Set circular = 1 in order to initialise DM particles on circular orbits. Default is 0 (isotropic orbits).
+        circular (int)  : Set circular = 1 in order to initialise DM particles on circular orbits (circular = 2 for circular orbits over the poles). Default is 0 (isotropic orbits).
         include_DM_mass (bool): Set to True in order to include the enclosed DM mass in the calculation of the initial velocity (for a given a_i, e_i)
+        dtype_dm (dtype): Floating point type for the DM positions and velocities (see `particles`). Default = np.float64
     
     Returns:
         p (particles)   : Set of particles
@@ -380,7 +525,7 @@ def particles_in_binary(M_1, M_2, a_i, e_i=0.0, N_DM=0, dynamic_BH=True, rho_6=1
     else:
         M_DM = 0.0
     
-    p = particles(M_1, M_2, N_DM=N_DM, M_DM=M_DM, dynamic_BH=dynamic_BH)
+    p = particles(M_1, M_2, N_DM=N_DM, M_DM=M_DM, dynamic_BH=dynamic_BH, dtype_dm=dtype_dm)
     
     #Initialise BH properties
     r_i = a_i * ( 1 + e_i)
@@ -398,11 +543,11 @@ def particles_in_binary(M_1, M_2, a_i, e_i=0.0, N_DM=0, dynamic_BH=True, rho_6=1
     else:
         factor = 0
             
-    p.xBH1[:] = np.atleast_2d([-r_i*factor,   0, 0])
-    p.xBH2[:] = np.atleast_2d([r_i*(1-factor),   0, 0])
+    p.xBH1[:] = [-r_i*factor,   0, 0]
+    p.xBH2[:] = [r_i*(1-factor),   0, 0]
 
-    p.vBH1[:] = np.atleast_2d([0.0, v_i*factor, 0])
-    p.vBH2[:] = np.atleast_2d([0.0, -v_i*(1-factor), 0])
+    p.vBH1[:] = [0.0, v_i*factor, 0]
+    p.vBH2[:] = [0.0, -v_i*(1-factor), 0]
     
     if (N_DM > 0):
         p.initialize_spike(rho_6, gamma_sp, r_max, r_t, alpha, circular, r_soft)
@@ -35,12 +35,12 @@ def load_trajectory(fileID):
     
     f = open_file_for_read(fileID)
     
-    ts       = np.array(f['data']['t'])
-    xBH1_list = np.array(f['data']['xBH1'])
-    vBH1_list = np.array(f['data']['vBH1'])
+    ts       = f['data']['t'][:]
+    xBH1_list = f['data']['xBH1'][:]
+    vBH1_list = f['data']['vBH1'][:]
     
-    xBH2_list = np.array(f['data']['xBH2'])
-    vBH2_list = np.array(f['data']['vBH2'])
+    xBH2_list = f['data']['xBH2'][:]
+    vBH2_list = f['data']['vBH2'][:]
     
     xBH_list = xBH2_list - xBH1_list
     vBH_list = vBH2_list - vBH1_list
@@ -52,8 +52,8 @@ def load_trajectory(fileID):
     dynamic_BH = f['data'].attrs["dynamic"]
 
     try:
-        M1_list  = np.array(f['data']['M_1'])
-        M2_list  = np.array(f['data']['M_2'])
+        M1_list  = f['data']['M_1'][:]
+        M2_list  = f['data']['M_2'][:]
     except:
         M1_list = M_1*np.ones_like(ts)
         M2_list = M_2*np.ones_like(ts)
@@ -99,9 +99,10 @@ def load_DMparticles(fileID, which="initial"):
     else:
         tag = "i"
         
-    xDM_list =  np.array(f['data']['xDM_' + tag])
-    vDM_list =  np.array(f['data']['vDM_' + tag])
+    xDM_list =  f['data']['xDM_' + tag][:]
+    vDM_list =  f['data']['vDM_' + tag][:]
     
+    f.close()
     
     return xDM_list, vDM_list
 
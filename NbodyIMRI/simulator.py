@@ -3,10 +3,8 @@ from math import sqrt
 
 from os.path import join
 import os
-import matplotlib.pyplot as plt
 import numpy as np
 from tqdm import tqdm
-from scipy import signal
 
 from NbodyIMRI import tools, particles
 from NbodyIMRI import units as u
@@ -27,6 +25,70 @@ lam = -0.2123418310626054e+00
 chi = -0.6626458266981849e-01
 #-----------------------------
 
+# Softening kernels
+#-----------------------------
+#Acceleration of the DM particles due to a BH of (effective) mass M_eff, for each softening
+#method. Each kernel takes the prefactor neg_GM = -G_N*M_eff, the squared distances r_sq between the BH and the DM particles, with 
+#shape (N_DM,), and writes into `out` (also with shape (N_DM,)) the factor which multiplies the 
+#(unnormalised) separations dx, so that the acceleration is acc = out*dx. The factor 1/r which 
+#normalises dx is folded into each expression. The kernels work in place (r_sq is overwritten), 
+#so that no temporary arrays are allocated during the force calculation.
+#The kernel is selected once (see `simulator.soft_method`), so there is no string dispatch in the 
+#force calculation.
+
+def _acc_plummer(neg_GM, r_sq, r_soft_sq, out):
+    np.sqrt(r_sq, out=out)
+    r_sq += r_soft_sq
+    out *= r_sq
+    np.divide(neg_GM, out, out=out)
+    
+def _acc_plummer2(neg_GM, r_sq, r_soft_sq, out):
+    np.add(r_sq, r_soft_sq, out=out)
+    np.power(out, -5/2, out=out)
+    r_sq *= 2
+    r_sq += 5*r_soft_sq
+    out *= r_sq
+    out *= 0.5*neg_GM
+    
+def _acc_uniform_old(neg_GM, r_sq, r_soft_sq, out):
+    #The older softening profile is kept for reference (and so is not written to work in place)
+    inv_rs2 = 1.0/np.float64(r_soft_sq)
+    x_sq = r_sq*inv_rs2
+    x = np.sqrt(x_sq)
+    np.copyto(out, np.where(x_sq < 1, neg_GM*(8 - 9*x + 2*x*x_sq)*inv_rs2*np.sqrt(inv_rs2), neg_GM*(r_sq)**-1.5))
+    
+def _acc_uniform(neg_GM, r_sq, r_soft_sq, out):
+    #Inside r_soft the force is -G M dx/r_soft^3, outside it is -G M dx/r^3
+    np.maximum(r_sq, r_soft_sq, out=out)
+    np.power(out, -1.5, out=out)
+    out *= neg_GM
+    
+def _acc_truncate(neg_GM, r_sq, r_soft_sq, out):
+    np.sqrt(r_sq, out=out)
+    np.maximum(r_sq, r_soft_sq, out=r_sq)
+    out *= r_sq
+    np.divide(neg_GM, out, out=out)
+    
+def _acc_empty_shell(neg_GM, r_sq, r_soft_sq, out):
+    #No force inside r_soft: the masked copy avoids gathering/scattering the particles inside r_soft
+    np.power(r_sq, -1.5, out=out)
+    out *= neg_GM
+    np.copyto(out, 0.0, where=(r_sq < r_soft_sq))
+
+_softening_kernels = {"plummer"     : _acc_plummer,
+                      "plummer2"    : _acc_plummer2,
+                      "uniform_old" : _acc_uniform_old,
+                      "uniform"     : _acc_uniform,
+                      "truncate"    : _acc_truncate,
+                      "empty_shell" : _acc_empty_shell}
+
+def _get_softening_kernel(method):
+    try:
+        return _softening_kernels[method]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid softening method:" + str(method)) from None
+#-----------------------------
+
 #NB: For PN corrections, see https://arxiv.org/abs/1312.1289
 #NB: Deal with saving of M1 and M2 values for wheel and spoke
 
@@ -61,6 +123,31 @@ class simulator():
         self.check_state = check_state
         self.background_field = None
         
+        #Work arrays for update_acceleration (resized on first use, see `_get_workspace`)
+        self._acc_DM1   = np.empty((3, 0))
+        self._acc_DM2   = np.empty((3, 0))
+        self._r_sq      = np.empty(0)
+        self._fac       = np.empty(0)
+        
+    @property
+    def soft_method(self):
+        return self._soft_method
+    
+    @soft_method.setter
+    def soft_method(self, method):
+        #Look up the softening kernel once, rather than dispatching on the string at every step
+        self._acc_kernel2 = _get_softening_kernel(method)
+        self._soft_method = method
+        
+    @property
+    def soft_method1(self):
+        return self._soft_method1
+    
+    @soft_method1.setter
+    def soft_method1(self, method):
+        self._acc_kernel1 = _get_softening_kernel(method)
+        self._soft_method1 = method
+        
                     
             
     def full_step(self, dt, method="PEFRL"):
@@ -76,44 +163,60 @@ class simulator():
         
         """
         
+        self._update_acc = self._get_update_acc()
+        self._get_stepper(method)(dt)
+        
+    def _get_stepper(self, method):
+        #Look up the leapfrog step for a given method once, rather than comparing strings at every step
+        steppers = {"DKD"   : self._step_DKD,
+                    "FR"    : self._step_FR,
+                    "PEFRL" : self._step_PEFRL}
+        try:
+            return steppers[method]
+        except (KeyError, TypeError):
+            raise ValueError("Invalid leapfrog method:" + str(method)) from None
         
+    def _step_DKD(self, dt):
         #2nd order 'standard' leapfrog
-        if (method == "DKD"):
-            self.p.xstep(0.5*dt)
-            self.update_acceleration()
-            self.p.vstep(1.0*dt)
-            self.p.xstep(0.5*dt)
+        p = self.p
+        p.xstep(0.5*dt)
+        self._update_acc()
+        p.vstep(1.0*dt)
+        p.xstep(0.5*dt)
 
+    def _step_FR(self, dt):
         #4th order Ruth-Forest (FR) leapfrog
-        elif (method == "FR"):
-            self.p.xstep(theta*dt/2)
-            self.update_acceleration()
-            self.p.vstep(theta*dt)
-            self.p.xstep((1-theta)*dt/2)
-            self.update_acceleration()
-            self.p.vstep((1-2*theta)*dt)
-            self.p.xstep((1-theta)*dt/2)
-            self.update_acceleration()
-            self.p.vstep(theta*dt)
-            self.p.xstep(theta*dt/2)
-        
+        p = self.p
+        update_acceleration = self._update_acc
+        p.xstep(theta*dt/2)
+        update_acceleration()
+        p.vstep(theta*dt)
+        p.xstep((1-theta)*dt/2)
+        update_acceleration()
+        p.vstep((1-2*theta)*dt)
+        p.xstep((1-theta)*dt/2)
+        update_acceleration()
+        p.vstep(theta*dt)
+        p.xstep(theta*dt/2)
+    
+    def _step_PEFRL(self, dt):
         #Improved 4th order "Position Extended Forest-Ruth Like" (PEFRL) leapfrog
-        elif (method == "PEFRL"):
-            self.p.xstep(xi*dt)
-            self.update_acceleration()
-            self.p.vstep((1-2*lam)*dt/2)
-            self.p.xstep(chi*dt)
-            self.update_acceleration()
-            self.p.vstep(lam*dt)
-            self.p.xstep((1-2*(chi + xi))*dt)
-            self.update_acceleration()
-            self.p.vstep(lam*dt)
-            self.p.xstep(chi*dt)
-            self.update_acceleration()
-            self.p.vstep((1-2*lam)*dt/2)
-            self.p.xstep(xi*dt)
+        p = self.p
+        update_acceleration = self._update_acc
+        p.xstep(xi*dt)
+        update_acceleration()
+        p.vstep((1-2*lam)*dt/2)
+        p.xstep(chi*dt)
+        update_acceleration()
+        p.vstep(lam*dt)
+        p.xstep((1-2*(chi + xi))*dt)
+        update_acceleration()
+        p.vstep(lam*dt)
+        p.xstep(chi*dt)
+        update_acceleration()
+        p.vstep((1-2*lam)*dt/2)
+        p.xstep(xi*dt)
         
-                
     def update_acceleration(self):
         """
         Update the acceleration of all particles in p, based on current positions.
@@ -122,133 +225,105 @@ class simulator():
             None
         """
         
-        #Calculate separations between DM particles and central BH
-        dx1     = (self.p.xDM - self.p.xBH1)
-        r1      = np.linalg.norm(dx1, axis=-1, keepdims=True)
-        dx1    /= r1
-        r1_sq   = r1**2
+        self._get_update_acc()()
         
-        if (self.p.dynamic_BH):
-            M1_eff  = self.p.M_1
-            M2_eff  = self.p.M_2
+    def _get_update_acc(self):
+        #Select the force calculation for the current configuration of the BHs, so that the checks
+        #on M_2 and dynamic_BH are not repeated at every call (see `run_simulation` and `full_step`)
+        if (self.p.M_2 <= 0):
+            return self._update_acc_single
+        elif (self.p.dynamic_BH):
+            return self._update_acc_dynamic
         else:
-            #M1_eff  = self.p.M_1
-            #M2_eff  = self.p.M_2
-            M1_eff  = self.p.M_1 + self.p.M_2
-            M2_eff  = (self.p.M_1*self.p.M_2)/(self.p.M_1 + self.p.M_2)
-
-        #Calculate forces (including softening)
-        if (self.soft_method1 == "plummer"):
-            acc_DM1 = -u.G_N*M1_eff*dx1*(r1_sq + self.r_soft_sq1)**-1
-            
-        elif (self.soft_method1 == "plummer2"):
-            acc_DM1 = -u.G_N*M1_eff*r1*(dx1/2)*(2*r1_sq + 5*self.r_soft_sq1)*(r1_sq + self.r_soft_sq1)**(-5/2)
+            return self._update_acc_static
             
-        elif (self.soft_method1 == "uniform_old"):
-            x = np.sqrt(r1_sq/self.r_soft_sq1)
-            acc_DM1 = -u.G_N*M1_eff*dx1*(r1_sq)**-1
-            inds = x < 1
-            if (np.sum(inds) > 1):
-                inds = inds.flatten()
-                acc_DM1[inds] = -u.G_N*M1_eff*dx1[inds,:]*x[inds]*(8 - 9*x[inds] + 2*(x[inds])**3)/(self.r_soft_sq1)
-
-        elif (self.soft_method1 == "uniform"):
-            x = np.sqrt(r1_sq/self.r_soft_sq1)
-            acc_DM1 = -u.G_N*M1_eff*dx1*(r1_sq)**-1
-            inds = x < 1
-            if (np.sum(inds) > 1):
-                inds = inds.flatten()
-                acc_DM1[inds] = -u.G_N*M1_eff*dx1[inds,:]*x[inds]/(self.r_soft_sq1)
-                
-        elif (self.soft_method1 == "truncate"):
-            r1_sq = np.clip(r1_sq, self.r_soft_sq1, 1e50)
-            acc_DM1 = -u.G_N*M1_eff*dx1/r1_sq
-
-        elif (self.soft_method1 == "empty_shell"):
-            x = np.sqrt(r1_sq/self.r_soft_sq1)
-            acc_DM1 = -u.G_N*M1_eff*dx1*(r1_sq)**-1
-            inds = x < 1
-            if (np.sum(inds) >= 1):
-                inds = inds.flatten()      
-                acc_DM1[inds] *= 0.0
-
-        else:
-            raise ValueError("Invalid softening method:" + self.soft_method1)
+    def _update_acc_single(self):
+        #Central BH only (M_2 = 0), so neither BH is accelerated
+        p = self.p
         
-        #Calculate forces on second BH (if it exists)
-        if (self.p.M_2 > 0):
-            dx2     = (self.p.xDM - self.p.xBH2)
-            r2      = np.linalg.norm(dx2, axis=-1, keepdims=True)
-            dx2     /= r2
-            r2_sq   = r2**2 
-
-
-            if (self.soft_method == "plummer"):
-                acc_DM2 = -u.G_N*M2_eff*dx2*(r2_sq + self.r_soft_sq2)**-1
-
-            elif (self.soft_method == "plummer2"):
-                acc_DM2 = -u.G_N*M2_eff*r2*(dx2/2)*(2*r2_sq + 5*self.r_soft_sq2)*(r2_sq + self.r_soft_sq2)**(-5/2)
-
-            elif (self.soft_method == "uniform_old"):
-                x = np.sqrt(r2_sq/self.r_soft_sq2)
-                acc_DM2 = -u.G_N*M2_eff*dx2*(r2_sq)**-1
-                inds = x < 1
-                if (np.sum(inds) > 1):
-                    inds = inds.flatten()
-                    acc_DM2[inds] = -u.G_N*M2_eff*dx2[inds,:]*x[inds]*(8 - 9*x[inds] + 2*(x[inds])**3)/(self.r_soft_sq2)
-
-            elif (self.soft_method == "uniform"):
-                x = np.sqrt(r2_sq/self.r_soft_sq2)
-                acc_DM2 = -u.G_N*M2_eff*dx2*(r2_sq)**-1
-                inds = x < 1
-                if (np.sum(inds) > 1):
-                    inds = inds.flatten()
-                    acc_DM2[inds] = -u.G_N*M2_eff*dx2[inds,:]*x[inds]/(self.r_soft_sq2)
-
-            elif (self.soft_method == "truncate"):
-                r2_sq = np.clip(r2_sq, self.r_soft_sq2, 1e50)
-                acc_DM2 = -u.G_N*M2_eff*dx2/r2_sq
-
-            elif (self.soft_method == "empty_shell"):
-                x = np.sqrt(r2_sq/self.r_soft_sq2)
-                acc_DM2 = -u.G_N*M2_eff*dx2*(r2_sq)**-1
-                inds = x < 1
-                if (np.sum(inds) >= 1):
-                    inds = inds.flatten()      
-                    acc_DM2[inds] *= 0.0
-
-            else:
-                raise ValueError("Invalid softening method:" + self.soft_method)
+        acc_DM1, acc_DM2, r_sq, fac = self._get_workspace(p.xDM.shape[0])
+        self._acc_DM(p.xBH1, p.M_1, self.r_soft_sq1, self._acc_kernel1, acc_DM1, r_sq, fac)
+        
+        p.dvdtBH1 = 0.0
+        p.dvdtBH2 = 0.0
+        p.dvdtDM  = acc_DM1.T
+        
+        self._add_background_field()
+        
+    def _update_acc_dynamic(self):
+        #Both BHs are evolved
+        p = self.p
+        
+        #Acceleration of central BH due only to m2
+        acc_BH = self._update_acc_binary(p.M_1, p.M_2)
+        p.dvdtBH1 = acc_BH
+        
+        self._add_background_field()
+    
+    def _update_acc_static(self):
+        #Central BH held fixed, so the secondary moves with the reduced mass 
+        p = self.p
+        M_1, M_2 = p.M_1, p.M_2
+        
+        #M1_eff  = M_1
+        #M2_eff  = M_2
+        self._update_acc_binary(M_1 + M_2, (M_1*M_2)/(M_1 + M_2))
+        p.dvdtBH1 = 0.0
+        
+        self._add_background_field()
+        
+    def _update_acc_binary(self, M1_eff, M2_eff):
+        #Accelerations of the DM particles and the secondary, due to both BHs. 
+        #Returns the acceleration acc_BH between the two BHs.
+        p       = self.p
+        xBH1    = p.xBH1
+        xBH2    = p.xBH2
+        
+        acc_DM1, acc_DM2, r_sq, fac = self._get_workspace(p.xDM.shape[0])
+        
+        #Calculate forces (including softening) from each BH
+        self._acc_DM(xBH1, M1_eff, self.r_soft_sq1, self._acc_kernel1, acc_DM1, r_sq, fac)
+        self._acc_DM(xBH2, M2_eff, self.r_soft_sq2, self._acc_kernel2, acc_DM2, r_sq, fac)
 
-            #Calculate forces between the 2 BHs  
-            dx12    = (self.p.xBH1 - self.p.xBH2)
-            r12_sq  = np.linalg.norm(dx12, axis=-1, keepdims=True)**2
-            acc_BH = -u.G_N*M2_eff*dx12*(r12_sq)**-1.5
-        else:
-            acc_BH = 0.0
-            acc_DM2 = 0.0
+        #Calculate forces between the 2 BHs  
+        dx12    = (xBH1 - xBH2)
+        r12_sq  = dx12 @ dx12
+        acc_BH = -u.G_N*M2_eff*dx12*(r12_sq)**-1.5
         
-        #Save the values of the acceleration
-        if (self.p.dynamic_BH):
-            #Acceleration of central BH due only to m2
-            self.p.dvdtBH1 = acc_BH #- (1/M1_eff)*np.sum(np.atleast_2d(self.p.M_DM).T*acc_DM1, axis=0)
-        else:
-            self.p.dvdtBH1 = 0.0
+        p.dvdtBH2 = -(M1_eff/M2_eff)*acc_BH - (1/M2_eff)*(acc_DM2 @ p.M_DM)
         
-        if (self.p.M_2 > 0):
-            self.p.dvdtBH2 = -(M1_eff/M2_eff)*acc_BH - (1/M2_eff)*np.sum(np.atleast_2d(self.p.M_DM).T*acc_DM2, axis=0)
-        else:
-            self.p.dvdtBH2 = 0.0
+        acc_DM1 += acc_DM2
+        p.dvdtDM  = acc_DM1.T
+        
+        return acc_BH
         
-        self.p.dvdtDM  = acc_DM1 + acc_DM2            
+    def _acc_DM(self, xBH, M_eff, r_soft_sq, kernel, acc_DM, r_sq, fac):
+        #Acceleration of the DM particles due to a single BH, written into acc_DM, with shape (3, N_DM).
+        #The separations are calculated in acc_DM and then scaled in place by the softening kernel.
+        #DM positions are used as (3, N_DM), so that the x, y, z components are each contiguous
+        np.subtract(self.p.xDM.T, xBH[:,None], out=acc_DM)
+        np.einsum('ij,ij->j', acc_DM, acc_DM, out=r_sq)
+        kernel(-u.G_N*M_eff, r_sq, r_soft_sq, fac)
+        acc_DM *= fac
         
+    def _add_background_field(self):
         #Now, if a background force field has been set, calculate the acceleration
         if self.background_field is not None:
-            self.p.dvdtBH1 += self.background_field(self.p.xBH1)
-            self.p.dvdtBH2 += self.background_field(self.p.xBH2)
-            self.p.dvdtDM  += self.background_field(self.p.xDM)
-        
-    
+            p = self.p
+            p.dvdtBH1 += self.background_field(p.xBH1)
+            p.dvdtBH2 += self.background_field(p.xBH2)
+            p.dvdtDM  += self.background_field(p.xDM)
+            
+    def _get_workspace(self, N):
+        #The separations from each BH, which are scaled in place into the accelerations, 
+        #plus the squared distances and the force factor. These are only reallocated 
+        #if the number of DM particles changes (e.g. by removing particles in check_state)
+        if (self._acc_DM1.shape[1] != N):
+            self._acc_DM1   = np.empty((3, N))
+            self._acc_DM2   = np.empty((3, N))
+            self._r_sq      = np.empty(N)
+            self._fac       = np.empty(N)
+        return self._acc_DM1, self._acc_DM2, self._r_sq, self._fac
             
     def run_simulation(self, dt, t_end, method="PEFRL", save_to_file = False, add_to_list = False, show_progress=False, save_DM_states=False, N_save=1, label=None):
         """
@@ -264,7 +339,7 @@ class simulator():
             add_to_list (bool):     Set to True in order to save metadata about the simulation to `SimulationList.txt`. Default = False. 
             show_progress (bool):   Set to True in order to show a progress bar during the simulation. Default = False
             save_DM_states (bool):  Set to True in order to save the initial and final configuration of the DM particles in the output. Default = False
-            N_save (int):    Number of time steps in between saving the data to file. Default = 1
+            N_save (int):    Number of time steps in between saving the BH data (to file and to the lists xBH1_list etc.). Default = 1
             label (str):    String to be used in the name of the output file (along with the IDhash). 
         
         Returns:
@@ -288,22 +363,24 @@ class simulator():
             
         N_step = int(np.ceil(t_end/dt)) 
         
-        #Initialise lists to save the BH positions
-        self.ts        = np.linspace(0, t_end, N_step)
-        self.xBH1_list = np.zeros((N_step, 3))
-        self.vBH1_list = np.zeros((N_step, 3))
-    
-        self.xBH2_list = np.zeros((N_step, 3))
-        self.vBH2_list = np.zeros((N_step, 3))
-        
-        self.M1_list   = np.zeros(N_step)
-        self.M2_list   = np.zeros(N_step)
-        
-        
         #N_save = 100 #Save only every 100 timesteps
         #N_save = 1
         #N_out = int(N_step/N_save)
-        N_out = len(self.ts[::N_save])
+        #Number of saved steps (0, N_save, 2*N_save, ...), i.e. ceil(N_step/N_save)
+        N_out = (N_step + N_save - 1)//N_save
+        
+        #Initialise lists to save the BH positions (only every N_save steps). The times 
+        #are those of the saved steps on the grid np.linspace(0, t_end, N_step)
+        self.ts        = np.arange(0, N_step, N_save)*(t_end/max(N_step - 1, 1))
+        self.xBH1_list = np.zeros((N_out, 3))
+        self.vBH1_list = np.zeros((N_out, 3))
+    
+        self.xBH2_list = np.zeros((N_out, 3))
+        self.vBH2_list = np.zeros((N_out, 3))
+        
+        self.M1_list   = np.zeros(N_out)
+        self.M2_list   = np.zeros(N_out)
+        
         N_update = 100_000 #Update the output file only every 100_000 steps
         #N_update = 1
 
@@ -313,16 +390,20 @@ class simulator():
             a_i, e_i = self.p.orbital_elements()
             self.a_i = float(a_i)
             self.e_i = float(e_i)
-            T_orb    = self.p.T_orb()
         else:
             self.a_i = 0
             self.e_i = 0    
+        self.T_orb_i = tools.calc_Torb(self.a_i, self.p.M_tot())
 
         self.M_2_ini = self.p.M_2
         
         self.method = method
         self.finished = False
         
+        #Select the leapfrog method and the force calculation once for the whole run
+        step = self._get_stepper(method)
+        self._update_acc = self._get_update_acc()
+        
         #Open output file
         if (save_to_file):
             fname = f"{NbodyIMRI.snapshot_dir}/{self.fileID}.hdf5"
@@ -332,20 +413,22 @@ class simulator():
                 print("Old file removed successfully:", fname)
             except: 
                 print("No old snapshot file found...")
-            f = self.open_outputfile(fname, N_out, save_DM_states)
+            #Chunk the BH datasets so that each periodic update fills exactly one chunk
+            N_chunk = min(max(1, N_update//N_save), N_out)
+            f = self.open_outputfile(fname, N_out, save_DM_states, self.a_i, self.e_i, N_chunk)
+            self.i_written = 0
 
         
         
         #Save the time steps and the initial DM configuration
         if (save_to_file):
-            print(N_step, len(self.t_data[:]), len(1.0*self.ts[::N_save]))
-            self.t_data[:] = 1.0*self.ts[::N_save]
+            self.t_data[:] = self.ts
             self.M1_list[0] = self.p.M_1
             self.M2_list[0] = self.p.M_2
         
             if (save_DM_states):
-                self.xDM_i_data[:,:] = 1.0*self.p.xDM
-                self.vDM_i_data[:,:] = 1.0*self.p.vDM
+                self.xDM_i_data[:,:] = self.p.xDM
+                self.vDM_i_data[:,:] = self.p.vDM
         
     
         #Define a dummy in case we're not using a progress bar
@@ -353,60 +436,64 @@ class simulator():
         if (show_progress):
             stepper = tqdm
         
+        #Number of output rows between updates of the output file
+        N_flush = max(1, N_update//N_save)
+        check_state = self.check_state
+        
         #print("N_steps:", N_step)
-        #Simulate for N_step time-steps
-        for it in stepper(range(N_step)):
+        #Simulate for N_step time-steps, in blocks of N_save steps (one block per saved row)
+        for i_out in stepper(range(N_out)):
+            
+            #Number of time-steps in this block (the final block may be shorter)
+            N_block = min(N_save, N_step - i_out*N_save)
             
             #Do any checks of the state of the system in between timesteps
-            if (self.check_state is not None):
-                self.check_state(self)
+            #(re-selecting the force calculation, in case M_2 or dynamic_BH were changed)
+            if (check_state is not None):
+                check_state(self)
+                self._update_acc = self._get_update_acc()
               
             #Save current binary configuration to array
-            self.M1_list[it]     = self.p.M_1
-            self.M2_list[it]     = self.p.M_2
+            self.M1_list[i_out]     = self.p.M_1
+            self.M2_list[i_out]     = self.p.M_2
             
-            self.xBH1_list[it,:] = self.p.xBH1
-            self.vBH1_list[it,:] = self.p.vBH1
+            self.xBH1_list[i_out,:] = self.p.xBH1
+            self.vBH1_list[i_out,:] = self.p.vBH1
         
-            self.xBH2_list[it,:] = self.p.xBH2
-            self.vBH2_list[it,:] = self.p.vBH2
+            self.xBH2_list[i_out,:] = self.p.xBH2
+            self.vBH2_list[i_out,:] = self.p.vBH2
         
-            #Update data saved in file
-            if ((it%N_update == 0) and (save_to_file)):
-                #print(N_step, N_save, N_out, N_update)
-                self.M_1_data[:]    = 1.0*self.M1_list[::N_save]
-                self.M_2_data[:]    = 1.0*self.M2_list[::N_save]
-                
-                self.xBH1_data[:,:] = 1.0*self.xBH1_list[::N_save,:]
-                self.vBH1_data[:,:] = 1.0*self.vBH1_list[::N_save,:]
-            
-                self.xBH2_data[:,:] = 1.0*self.xBH2_list[::N_save,:]
-                self.vBH2_data[:,:] = 1.0*self.vBH2_list[::N_save,:]
-            
-            #Step forward by dt
-            self.full_step(dt, method)
+            #Update data saved in file (only the N_flush rows saved since the last update, 
+            #i.e. one whole chunk of each dataset)
+            if (((i_out + 1)%N_flush == 0) and (save_to_file)):
+                self.write_output(i_out + 1)
             
-            #Increment the current step number (this is primarily so that the 
-            #check_state function has some idea about how far in the simulation we are...)
-            self.current_step += 1
+            #Step forward by dt, N_block times. The current step number is incremented 
+            #after each step (this is primarily so that the check_state function has some 
+            #idea about how far in the simulation we are...)
+            if (check_state is None):
+                for k in range(N_block):
+                    step(dt)
+                self.current_step += N_block
+            else:
+                step(dt)
+                self.current_step += 1
+                for k in range(N_block - 1):
+                    check_state(self)
+                    self._update_acc = self._get_update_acc()
+                    step(dt)
+                    self.current_step += 1
         
 
         #One final update of the output data   
         if (save_to_file):
-            self.M_1_data[:]    = 1.0*self.M1_list[::N_save]
-            self.M_2_data[:]    = 1.0*self.M2_list[::N_save]
-            
-            self.xBH1_data[:,:] = 1.0*self.xBH1_list[::N_save,:]
-            self.vBH1_data[:,:] = 1.0*self.vBH1_list[::N_save,:]
-    
-            self.xBH2_data[:,:] = 1.0*self.xBH2_list[::N_save,:]
-            self.vBH2_data[:,:] = 1.0*self.vBH2_list[::N_save,:]
+            self.write_output(N_out)
     
             if (save_DM_states):
-                self.xDM_f_data[:,:] = 1.0*self.p.xDM
-                self.vDM_f_data[:,:] = 1.0*self.p.vDM
+                self.xDM_f_data[:,:] = self.p.xDM
+                self.vDM_f_data[:,:] = self.p.vDM
                 
-                self.M_DM_data[:] =  1.0*self.p.M_DM
+                self.M_DM_data[:] = self.p.M_DM
     
         print("> Simulation completed.")
     
@@ -420,8 +507,34 @@ class simulator():
         self.finished = True
         
         
+    def write_output(self, i_end):
+        """
+        Write the BH data for the output rows which have not yet been written to file, up to (but not including) row i_end.
+        Each row is written only once, so the cost of updating the file does not grow with the length of the simulation.
+        
+        Parameters:
+            i_end (int)     : Index of the last output row to write, plus one.
+        
+        Returns:
+            None
+        """
+        i0 = self.i_written
+        if (i_end <= i0):
+            return
+        
+        self.M_1_data[i0:i_end]   = self.M1_list[i0:i_end]
+        self.M_2_data[i0:i_end]   = self.M2_list[i0:i_end]
+        
+        self.xBH1_data[i0:i_end,:] = self.xBH1_list[i0:i_end,:]
+        self.vBH1_data[i0:i_end,:] = self.vBH1_list[i0:i_end,:]
+    
+        self.xBH2_data[i0:i_end,:] = self.xBH2_list[i0:i_end,:]
+        self.vBH2_data[i0:i_end,:] = self.vBH2_list[i0:i_end,:]
+        
+        self.i_written = i_end
+        
 
-    def open_outputfile(self, fname, N_step, save_DM_states):
+    def open_outputfile(self, fname, N_step, save_DM_states, a_i, e_i, N_chunk=None):
         """
         ...
         
@@ -431,8 +544,6 @@ class simulator():
         grp.attrs['M_1'] = self.p.M_1/u.Msun
         grp.attrs['M_2'] = self.M_2_ini/u.Msun
         
-        a_i, e_i = self.p.orbital_elements()
-        
         #Still need to add other stuff here!
         
         grp.attrs['a_i'] = a_i/u.pc
@@ -446,25 +557,31 @@ class simulator():
             grp.attrs['dynamic'] = 0
         
     
+        #The time-series datasets are written a slice at a time (see `write_output`), 
+        #so they are chunked along the time axis with N_chunk rows per chunk
+        chunks_1D = (N_chunk,) if (N_chunk is not None) else True
+        chunks_3D = (N_chunk, 3) if (N_chunk is not None) else True
+    
         datatype = np.float64
-        self.t_data   = grp.create_dataset("t", (N_step,), dtype=datatype, compression="gzip")
-        self.M_1_data = grp.create_dataset("M_1", (N_step,), dtype=datatype, compression="gzip")
-        self.M_2_data = grp.create_dataset("M_2", (N_step,), dtype=datatype, compression="gzip")
+        self.t_data   = grp.create_dataset("t", (N_step,), dtype=datatype, chunks=chunks_1D, compression="gzip")
+        self.M_1_data = grp.create_dataset("M_1", (N_step,), dtype=datatype, chunks=chunks_1D, compression="gzip")
+        self.M_2_data = grp.create_dataset("M_2", (N_step,), dtype=datatype, chunks=chunks_1D, compression="gzip")
         
-        self.xBH1_data = grp.create_dataset("xBH1", (N_step,3), dtype=datatype, compression="gzip")
-        self.vBH1_data = grp.create_dataset("vBH1", (N_step,3), dtype=datatype, compression="gzip")
+        self.xBH1_data = grp.create_dataset("xBH1", (N_step,3), dtype=datatype, chunks=chunks_3D, compression="gzip")
+        self.vBH1_data = grp.create_dataset("vBH1", (N_step,3), dtype=datatype, chunks=chunks_3D, compression="gzip")
     
-        self.xBH2_data = grp.create_dataset("xBH2", (N_step,3), dtype=datatype, compression="gzip")
-        self.vBH2_data = grp.create_dataset("vBH2", (N_step,3), dtype=datatype, compression="gzip")
+        self.xBH2_data = grp.create_dataset("xBH2", (N_step,3), dtype=datatype, chunks=chunks_3D, compression="gzip")
+        self.vBH2_data = grp.create_dataset("vBH2", (N_step,3), dtype=datatype, chunks=chunks_3D, compression="gzip")
     
         
     
         if (save_DM_states):
-            self.xDM_i_data = grp.create_dataset("xDM_i", (self.p.N_DM,3), dtype=datatype, compression="gzip")
-            self.xDM_f_data = grp.create_dataset("xDM_f", (self.p.N_DM,3), dtype=datatype, compression="gzip")
+            #DM states are saved with the same precision as they are evolved
+            self.xDM_i_data = grp.create_dataset("xDM_i", (self.p.N_DM,3), dtype=self.p.dtype_dm, compression="gzip")
+            self.xDM_f_data = grp.create_dataset("xDM_f", (self.p.N_DM,3), dtype=self.p.dtype_dm, compression="gzip")
     
-            self.vDM_i_data = grp.create_dataset("vDM_i", (self.p.N_DM,3), dtype=datatype, compression="gzip")
-            self.vDM_f_data = grp.create_dataset("vDM_f", (self.p.N_DM,3), dtype=datatype, compression="gzip")
+            self.vDM_i_data = grp.create_dataset("vDM_i", (self.p.N_DM,3), dtype=self.p.dtype_dm, compression="gzip")
+            self.vDM_f_data = grp.create_dataset("vDM_f", (self.p.N_DM,3), dtype=self.p.dtype_dm, compression="gzip")
             
             self.M_DM_data = grp.create_dataset("M_DM", (self.p.N_DM,), dtype=datatype, compression="gzip")
     
@@ -478,7 +595,8 @@ class simulator():
         listfile = f'{NbodyIMRI.snapshot_dir}/SimulationList.txt'
         hdrtxt = "Columns: FileID, M_1/MSUN, M_2/MSUN, a_i/r_isco(M1), e_i, N_DM, M_DM/MSUN, Nstep_per_orb, N_orb, r_soft/PC, method, rho_6/(MSUN/PC**3), gamma, alpha, r_t/PC"
     
-        T_orb = 2*np.pi*np.sqrt(self.a_i**3/(u.G_N*self.p.M_tot()))
+        #Initial orbital period (calculated at the start of run_simulation)
+        T_orb = self.T_orb_i
     
         meta_data = np.array([self.fileID, self.p.M_1/u.Msun, self.M_2_ini/u.Msun, 
                             self.a_i/tools.calc_risco(self.p.M_1), self.e_i, self.p.N_DM, self.p.M_DM[0]/u.Msun, 
@@ -499,6 +617,7 @@ class simulator():
         """
         ...
         """
+        import matplotlib.pyplot as plt
         
         if (self.finished == False):
             print("Simulation has not been finished. Please run using `rum_simulation()`.")
@@ -535,6 +654,8 @@ class simulator():
         """
         ...
         """
+        import matplotlib.pyplot as plt
+        
         if (self.finished == False):
             print("Simulation has not been finished. Please run using `rum_simulation()`.")
             return 0
@@ -47,6 +47,12 @@ def get_random_direction():
     theta    = np.arccos(costheta)
     phi      = 2*np.pi*np.random.rand()
     return np.array([np.sin(theta)*np.cos(phi), np.sin(theta)*np.sin(phi), np.cos(theta)])
+
+def get_random_directions(N):
+    costheta = 2*np.random.rand(N) - 1
+    theta    = np.arccos(costheta)
+    phi      = 2*np.pi*np.random.rand(N)
+    return np.stack([np.sin(theta)*np.cos(phi), np.sin(theta)*np.sin(phi), np.cos(theta)], axis=-1)
     
 def generate_hash(length=5):
     h = np.zeros(length, dtype=str)
@@ -55,8 +61,11 @@ def generate_hash(length=5):
     return ''.join(h)
     
     
+def norm_sq(x):
+    return np.einsum('...i,...i->...', x, x)
+    
 def norm(x):
-    return np.sqrt(np.sum(x**2, axis=-1))
+    return np.sqrt(norm_sq(x))
 
 def calc_orbital_elements(x, v, Mtot):
     x_mag = norm(x)